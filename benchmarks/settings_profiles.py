@@ -0,0 +1,125 @@
+"""
+Compare startup time and per-request overhead of settings profiles.
+
+Usage:
+    python3 benchmarks/settings_profiles.py [--requests 1000] [--runs 5]
+
+Every run is a fresh process with in-memory sqlite DB, so numbers show
+settings overhead (apps, middleware, DEBUG query log, logging) not DB or Redis speed.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = [
+    'simple_djangorest.settings',
+    'simple_djangorest.settings_production',
+]
+
+
+def worker(requests_num):
+    """
+    Set up Django with DJANGO_SETTINGS_MODULE and time requests to API.
+
+    :param requests_num: requests to each endpoint
+    :return: dict with startup and per-request times in seconds
+    """
+    start = time.perf_counter()
+    from django.conf import settings
+    settings.DATABASES['default'].update(ENGINE='django.db.backends.sqlite3', NAME=':memory:', OPTIONS={})
+    # measure settings, not Redis round-trips of throttle sync
+    settings.THROTTLE_REDIS_URL = ''
+
+    from django.core.wsgi import get_wsgi_application
+    get_wsgi_application()
+    results = {'startup': time.perf_counter() - start}
+
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+    from currencies.models import ApiKey, Currency, CurrencyRate
+    from simple_djangorest.settings import ACTIVE_CURRENCIES
+
+    with connection.schema_editor() as editor:
+        for model in (Currency, CurrencyRate, ApiKey):
+            editor.create_model(model)
+    Currency.save_currencies_from_api(zip(('CZK', 'EUR', 'PLN', 'USD'), ACTIVE_CURRENCIES.keys()))
+    CurrencyRate.save_rates_from_api({
+        'timestamp': 1575309600,
+        'base': 'USD',
+        'rates': {'CZK': 23.0653, 'EUR': 0.9029, 'PLN': 3.871849},
+    })
+    api_key = ApiKey.create_key('benchmark', rate=f'{requests_num * 100}/sec')
+
+    client = Client(HTTP_HOST='localhost')
+    endpoints = {
+        'currencies_list': (reverse('api:currencies_list'), {}),
+        'currencies_convert': (
+            reverse('api:currencies_convert', kwargs={'value': 157.371, 'source': 'PLN', 'target': 'CZK'}),
+            {'HTTP_X_APP_ID': api_key.key}
+        ),
+    }
+    for name, (url, headers) in endpoints.items():
+        # warm up caches
+        assert client.get(url, **headers).status_code == 200
+        start = time.perf_counter()
+        for _ in range(requests_num):
+            client.get(url, **headers)
+        results[name] = (time.perf_counter() - start) / requests_num
+    return results
+
+
+def run_profile(profile, requests_num, runs):
+    """
+    Run worker processes for settings profile.
+
+    :return: dict with median times of runs
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+    # production profile requires secret key from environment
+    env.setdefault('EXCHANGERATES_SECRET_KEY', 'benchmark')
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', '--requests', str(requests_num)],
+            cwd=BASE_DIR, env=env, check=True, stdout=subprocess.PIPE
+        ).stdout
+        result = json.loads(output.decode().splitlines()[-1])
+        result['process'] = time.perf_counter() - start
+        samples.append(result)
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000, help='requests to each endpoint per run')
+    parser.add_argument('--runs', type=int, default=5, help='processes per profile, median is reported')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        sys.path.insert(0, BASE_DIR)
+        print(json.dumps(worker(args.requests)))
+        return
+
+    print(f'{"profile":<40}{"process ms":>12}{"setup ms":>12}{"list us/req":>14}{"convert us/req":>16}')
+    for profile in PROFILES:
+        result = run_profile(profile, args.requests, args.runs)
+        print(
+            f'{profile:<40}'
+            f'{result["process"] * 1e3:>12.1f}'
+            f'{result["startup"] * 1e3:>12.1f}'
+            f'{result["currencies_list"] * 1e6:>14.0f}'
+            f'{result["currencies_convert"] * 1e6:>16.0f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
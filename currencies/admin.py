@@ -1,3 +1,14 @@
 from django.contrib import admin
 
-# Register your models here.
+from currencies.models import ApiKey
+
+
+@admin.register(ApiKey)
+class ApiKeyAdmin(admin.ModelAdmin):
+    list_display = ('name', 'key', 'rate', 'is_active', 'created')
+    readonly_fields = ('key',)
+
+    def save_model(self, request, obj, form, change):
+        if not obj.key:
+            obj.key = ApiKey.generate_key()
+        super().save_model(request, obj, form, change)
@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+
+from currencies.models import ApiKey
+from currencies.throttling import AppIdLookupThrottle
+from simple_djangorest.settings import logger, API_KEY_CACHE_TIMEOUT
+
+
+class ApiKeyAuthentication(BaseAuthentication):
+    """
+    Authenticate request by APP ID passed in `app_id` query param or `X-App-Id` header.
+
+    Found keys are cached for API_KEY_CACHE_TIMEOUT seconds, so deactivated key
+    may stay valid until cache entry expires. Unknown keys are not cached,
+    DB lookups of keys missing in cache are throttled per client IP.
+    """
+    query_param = 'app_id'
+    header = 'HTTP_X_APP_ID'
+
+    def authenticate(self, request):
+        app_id = request.query_params.get(self.query_param) or request.META.get(self.header)
+        if not app_id:
+            raise NotAuthenticated(
+                detail={
+                    'error': True,
+                    'status': status.HTTP_401_UNAUTHORIZED,
+                    'message': 'missing_app_id',
+                    'description': 'No App ID provided - please pass it in app_id param or X-App-Id header'
+                },
+                code=status.HTTP_401_UNAUTHORIZED
+            )
+
+        api_key = self.get_api_key(request, app_id)
+        if api_key is None:
+            logger.warning(f'invalid APP ID: {app_id[:8]!r}')
+            raise AuthenticationFailed(
+                detail={
+                    'error': True,
+                    'status': status.HTTP_401_UNAUTHORIZED,
+                    'message': 'invalid_app_id',
+                    'description': 'Invalid App ID provided - please try again'
+                },
+                code=status.HTTP_401_UNAUTHORIZED
+            )
+
+        return None, api_key
+
+    def authenticate_header(self, request):
+        return 'App-Id'
+
+    @staticmethod
+    def get_api_key(request, app_id):
+        """
+        Get active API key from cache or DB.
+
+        :param request: request, its client IP limits DB lookups
+        :param app_id: APP ID string
+        :return: ApiKey object or None
+        :raise Throttled: if client made too many DB lookups
+        """
+        if len(app_id) > ApiKey._meta.get_field('key').max_length:
+            return None
+
+        cache_key = f'api_key:{app_id}'
+        api_key = cache.get(cache_key)
+        if api_key is None:
+            AppIdLookupThrottle().allow_request(request, None)
+            api_key = ApiKey.objects.filter(key=app_id, is_active=True).first()
+            if api_key is not None:
+                cache.set(cache_key, api_key, API_KEY_CACHE_TIMEOUT)
+        return api_key
@@ -0,0 +1,19 @@
+from django.core.exceptions import ValidationError
+from django.core.management import BaseCommand, CommandError
+
+from currencies.models import ApiKey
+
+
+class Command(BaseCommand):
+    help = 'Generate and save to DB new API key (APP ID)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='client name')
+        parser.add_argument('--rate', default='', help='rate limit, e.g. "100/min"; default rate if omitted')
+
+    def handle(self, *args, **options):
+        try:
+            api_key_obj = ApiKey.create_key(options['name'], options['rate'])
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+        self.stdout.write(api_key_obj.key)
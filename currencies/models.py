@@ -1,6 +1,9 @@
+import re
+import secrets
 import time
 
 import requests
+from django.core import exceptions
 from django.db import models, connection, transaction
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
@@ -8,6 +11,9 @@ from rest_framework.exceptions import ValidationError
 from simple_djangorest.settings import logger, BASE_CURRENCY_CODE, EXCHANGERATES_API_MAX_RETRIES, \
     EXCHANGERATES_API_LATEST_URL, EXCHANGERATES_API_RETRY_PAUSE, EXCHANGERATES_API_CURRENCIES_URL, ACTIVE_CURRENCIES
 
+# shared session keeps API connections alive, tests mount fake provider adapter on it
+api_session = requests.Session()
+
 
 class Currency(models.Model):
     code = models.CharField(verbose_name='3 letters code', max_length=3, db_index=True)
@@ -19,7 +25,7 @@ class Currency(models.Model):
 
     @classmethod
     def get_currencies_from_api(cls):
-        r = requests.get(EXCHANGERATES_API_CURRENCIES_URL, timeout=10)
+        r = api_session.get(EXCHANGERATES_API_CURRENCIES_URL, timeout=10)
         if r.status_code == 200:
             data = r.json()
             return [item for item in data.items() if item[1] in ACTIVE_CURRENCIES.keys()]
@@ -57,20 +63,21 @@ class CurrencyRate(models.Model):
         """
         attempt_num = 0
         while attempt_num < EXCHANGERATES_API_MAX_RETRIES:
+            attempt_num += 1
             try:
-                r = requests.get(EXCHANGERATES_API_LATEST_URL, timeout=10)
+                r = api_session.get(EXCHANGERATES_API_LATEST_URL, timeout=10)
                 if r.status_code == 200:
                     return r.json()
                 else:
-                    attempt_num += 1
                     logger.warning(
                         f'attempt: {attempt_num}, '
                         f'URL: {EXCHANGERATES_API_LATEST_URL}, '
                         f'response status: {r.status_code}'
                     )
-                    time.sleep(EXCHANGERATES_API_RETRY_PAUSE)
             except Exception as e:
-                logger.error(f'{e}')
+                logger.error(f'attempt: {attempt_num}, {e}')
+            if attempt_num < EXCHANGERATES_API_MAX_RETRIES:
+                time.sleep(EXCHANGERATES_API_RETRY_PAUSE)
 
     @classmethod
     def save_rates_from_api(cls, data):
@@ -171,3 +178,57 @@ class CurrencyRate(models.Model):
         currencies['timestamp'] = currencies_data[pair[0]].timestamp
 
         return currencies
+
+
+RATE_RE = re.compile(r'^(?P<num>\d+)/(s|sec|m|min|h|hour|d|day)$')
+
+
+def validate_rate(value):
+    """
+    Check rate is "<requests>/<period>" with at least 1 request, e.g. "100/min".
+    """
+    match = RATE_RE.match(value)
+    if match is None or int(match.group('num')) < 1:
+        raise exceptions.ValidationError(
+            f'invalid rate "{value}", expected "<requests>/<s|sec|m|min|h|hour|d|day>" with at least 1 request',
+            code='invalid_rate'
+        )
+
+
+class ApiKey(models.Model):
+    key = models.CharField(verbose_name='APP ID', max_length=40, unique=True)
+    name = models.CharField(verbose_name='client name', max_length=128)
+    rate = models.CharField(
+        verbose_name='rate limit', max_length=16, blank=True, validators=[validate_rate],
+        help_text='requests per period, e.g. "100/min"; blank for default rate'
+    )
+    is_active = models.BooleanField(verbose_name='is active', default=True)
+    created = models.DateTimeField(verbose_name='created', auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.key}'
+
+    @staticmethod
+    def generate_key():
+        """
+        Generate new random APP ID.
+
+        :return: 32 hex chars string
+        """
+        return secrets.token_hex(16)
+
+    @classmethod
+    def create_key(cls, name, rate=''):
+        """
+        Create API key with generated APP ID.
+
+        :param name: client name
+        :param rate: rate limit in "<requests>/<period>" format
+        :return: ApiKey object
+        :raise django.core.exceptions.ValidationError: if name or rate invalid
+        """
+        api_key_obj = cls(key=cls.generate_key(), name=name, rate=rate)
+        api_key_obj.full_clean()
+        api_key_obj.save()
+        logger.debug(f'created API key for {name}')
+        return api_key_obj
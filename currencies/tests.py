@@ -1,12 +1,19 @@
 import itertools
+import time
+from unittest import mock
 
+import requests
+from django.core.exceptions import ValidationError
+from django.core.management import call_command, CommandError
 from django.test import TestCase, Client
 from django.urls import reverse
 from rest_framework import status
 
 from currencies.serializers import CurrencySerializer
-from simple_djangorest.settings import BASE_CURRENCY_CODE
-from .models import Currency, CurrencyRate
+from simple_djangorest.settings import BASE_CURRENCY_CODE, EXCHANGERATES_API_MAX_RETRIES, EXCHANGERATES_API_RETRY_PAUSE
+from .fake_provider import fake_provider
+from .models import ApiKey, Currency, CurrencyRate, api_session
+from .throttling import AppIdLookupThrottle, TokenBucket, TokenBucketStore
 
 # initialize the APIClient app
 client = Client()
@@ -30,7 +37,8 @@ currencies_rates = {"disclaimer": "Usage subject to terms: https://openexchanger
 class GetAllCurrenciesTest(TestCase):
     """ Test module for GET all currencies API """
 
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         currencies_objs = []
         for currency in currencies.items():
             currencies_objs.append(Currency(code=currency[0], name=currency[1]))
@@ -50,8 +58,9 @@ class CurrencyLoadFromApiTest(TestCase):
     """ Test module for load currencies data from API """
 
     def test_get_currencies_from_api(self):
-        # get data from API
-        data = Currency.get_currencies_from_api()
+        # get data from fake API
+        with fake_provider(api_session):
+            data = Currency.get_currencies_from_api()
         data_sliced = {key: val for key, val in data[:len(currencies)]}
         self.assertEqual(data_sliced, currencies)
 
@@ -62,15 +71,21 @@ class CurrencyLoadFromApiTest(TestCase):
         self.assertEqual(db_objs, currencies)
 
 
+# patch time in models only, so fake provider latency really sleeps
+@mock.patch('currencies.models.time')
 class CurrencyRateLoadFromApiTest(TestCase):
     """ Test module for load currencies rate from API """
 
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         Currency.save_currencies_from_api(currencies.items())
 
-    def test_get_currencies_from_api(self):
-        # get data from API
-        data = CurrencyRate.get_rates_from_api()
+    def test_get_currencies_from_api(self, models_time):
+        # get data from fake API
+        with fake_provider(api_session) as provider:
+            data = CurrencyRate.get_rates_from_api()
+        self.assertEqual(len(provider.requests), 1)
+        models_time.sleep.assert_not_called()
         self.assertIsNotNone(data)
         self.assertTrue('timestamp' in data.keys())
         self.assertTrue('base' in data.keys())
@@ -79,7 +94,37 @@ class CurrencyRateLoadFromApiTest(TestCase):
         for key in currencies_rates['rates']:
             self.assertTrue(key in data['rates'].keys())
 
-    def test_save_currencies_from_api(self):
+    def test_get_currencies_from_api_latency(self, models_time):
+        # latency under request timeout delays response
+        latency = 0.05
+        with fake_provider(api_session, latency=latency) as provider:
+            start = time.perf_counter()
+            data = CurrencyRate.get_rates_from_api()
+            elapsed = time.perf_counter() - start
+        self.assertGreaterEqual(elapsed, latency)
+        self.assertEqual(len(provider.requests), 1)
+        models_time.sleep.assert_not_called()
+        self.assertEqual(data['timestamp'], currencies_rates['timestamp'])
+
+    def test_get_currencies_from_api_retry(self, models_time):
+        # API fails with server error and connection error before success
+        failures = [503, requests.ConnectionError('connection refused')]
+        with fake_provider(api_session, failures=failures) as provider:
+            data = CurrencyRate.get_rates_from_api()
+        self.assertEqual(len(provider.requests), len(failures) + 1)
+        self.assertEqual(models_time.sleep.call_args_list, [mock.call(EXCHANGERATES_API_RETRY_PAUSE)] * len(failures))
+        self.assertEqual(data['timestamp'], currencies_rates['timestamp'])
+
+    def test_get_currencies_from_api_max_retries(self, models_time):
+        for params in ({'failures': [500] * EXCHANGERATES_API_MAX_RETRIES}, {'latency': 60}):
+            models_time.sleep.reset_mock()
+            with fake_provider(api_session, **params) as provider:
+                data = CurrencyRate.get_rates_from_api()
+            self.assertIsNone(data)
+            self.assertEqual(len(provider.requests), EXCHANGERATES_API_MAX_RETRIES)
+            self.assertEqual(models_time.sleep.call_count, EXCHANGERATES_API_MAX_RETRIES - 1)
+
+    def test_save_currencies_from_api(self, models_time):
         # save data to DB
         result = CurrencyRate.save_rates_from_api(currencies_rates)
         self.assertTrue(result)
@@ -95,13 +140,25 @@ class CurrencyRateLoadFromApiTest(TestCase):
         for val in db_objs.values():
             self.assertEqual(val.timestamp, currencies_rates['timestamp'])
 
+    def test_save_currencies_from_fake_api(self, models_time):
+        with fake_provider(api_session):
+            data = CurrencyRate.get_rates_from_api()
+        # timestamp check, currencies select, savepoints and one insert per currency
+        with self.assertNumQueries(4 + len(currencies_rates['rates'])):
+            self.assertTrue(CurrencyRate.save_rates_from_api(data))
+        # same timestamp is not saved twice
+        self.assertFalse(CurrencyRate.save_rates_from_api(data))
+        self.assertEqual(CurrencyRate.objects.count(), len(currencies_rates['rates']))
+
 
 class ConvertCurrenciesTest(TestCase):
     """ Test module for convert currencies API """
 
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         Currency.save_currencies_from_api(currencies.items())
         CurrencyRate.save_rates_from_api(currencies_rates)
+        cls.api_key = ApiKey.create_key('test', rate='1000/sec')
 
     def test_get_pair_data(self):
         all_pairs = itertools.product(currencies.keys(), currencies.keys(), repeat=1)
@@ -128,7 +185,7 @@ class ConvertCurrenciesTest(TestCase):
                             'value': value,
                             'source': source,
                             'target': target
-                        }))
+                        }), HTTP_X_APP_ID=self.api_key.key)
                     # calc values
                     rate = currencies_rates['rates'][target] if target != BASE_CURRENCY_CODE else 1
                     rate /= currencies_rates['rates'][source] if source != BASE_CURRENCY_CODE else 1
@@ -149,7 +206,7 @@ class ConvertCurrenciesTest(TestCase):
                         'value': value,
                         'source': source,
                         'target': target
-                    }))
+                    }), HTTP_X_APP_ID=self.api_key.key)
                 # calc values
                 rate = 1
                 result = value
@@ -169,7 +226,7 @@ class ConvertCurrenciesTest(TestCase):
                     'value': value,
                     'source': source,
                     'target': target
-                }))
+                }), HTTP_X_APP_ID=self.api_key.key)
 
             self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
             self.assertTrue(response.data['error'])
@@ -189,7 +246,7 @@ class ConvertCurrenciesTest(TestCase):
                     'value': value,
                     'source': source,
                     'target': target
-                }))
+                }), HTTP_X_APP_ID=self.api_key.key)
 
             self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
             self.assertTrue(response.data['error'])
@@ -207,10 +264,157 @@ class ConvertCurrenciesTest(TestCase):
                     'value': value,
                     'source': source,
                     'target': target
-                }))
+                }), HTTP_X_APP_ID=self.api_key.key)
 
             self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
             self.assertTrue(response.data['error'])
             self.assertEqual(response.data['status'], str(status.HTTP_400_BAD_REQUEST))
             self.assertEqual(response.data['message'], 'invalid_currency')
             self.assertEqual(response.data['description'], 'Invalid currency code - please try again')
+
+
+class ApiKeyAuthenticationTest(TestCase):
+    """ Test module for convert currencies API authentication and throttling """
+
+    @classmethod
+    def setUpTestData(cls):
+        Currency.save_currencies_from_api(currencies.items())
+        CurrencyRate.save_rates_from_api(currencies_rates)
+        cls.url = reverse('api:currencies_convert', kwargs={'value': 10, 'source': 'EUR', 'target': 'PLN'})
+
+    def test_convert_missing_app_id(self):
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['message'], 'missing_app_id')
+
+    def test_convert_invalid_app_id(self):
+        for app_id in ('invalid', ApiKey.create_key('inactive').key):
+            ApiKey.objects.filter(key=app_id).update(is_active=False)
+            response = client.get(self.url, {'app_id': app_id})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(response.data['message'], 'invalid_app_id')
+
+    def test_convert_valid_app_id(self):
+        api_key = ApiKey.create_key('test')
+        response = client.get(self.url, {'app_id': api_key.key})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = client.get(self.url, HTTP_X_APP_ID=api_key.key)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_convert_throttled(self):
+        api_key = ApiKey.create_key('test', rate='2/min')
+        other_api_key = ApiKey.create_key('test', rate='2/min')
+        for _ in range(2):
+            response = client.get(self.url, HTTP_X_APP_ID=api_key.key)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = client.get(self.url, HTTP_X_APP_ID=api_key.key)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        self.assertTrue(response.data['error'])
+        self.assertEqual(response.data['status'], str(status.HTTP_429_TOO_MANY_REQUESTS))
+        self.assertEqual(response.data['message'], 'too_many_requests')
+        self.assertEqual(
+            response.data['description'],
+            f'Request rate limit exceeded - please try again in {response["Retry-After"]} seconds'
+        )
+        # other key has own bucket
+        response = client.get(self.url, HTTP_X_APP_ID=other_api_key.key)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_convert_invalid_app_id_throttled(self):
+        api_key = ApiKey.create_key('test')
+        with mock.patch.dict(AppIdLookupThrottle.THROTTLE_RATES, {'app_id_lookup': '2/min'}):
+            for app_id in ('invalid1', 'invalid2'):
+                response = client.get(self.url, HTTP_X_APP_ID=app_id, REMOTE_ADDR='10.0.0.1')
+                self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            # lookups limit is spent by unknown APP IDs
+            for app_id in ('invalid3', api_key.key):
+                response = client.get(self.url, HTTP_X_APP_ID=app_id, REMOTE_ADDR='10.0.0.1')
+                self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+                self.assertEqual(response.data['message'], 'too_many_requests')
+            # other clients are not affected
+            response = client.get(self.url, HTTP_X_APP_ID=api_key.key, REMOTE_ADDR='10.0.0.2')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_create_key_invalid_rate(self):
+        for rate in ('100', 'abc/min', '100/x', '0/min', '-1/min', '1.5/sec'):
+            with self.assertRaises(ValidationError):
+                ApiKey.create_key('test', rate=rate)
+            with self.assertRaises(CommandError):
+                call_command('create_api_key', 'test', rate=rate)
+        self.assertFalse(ApiKey.objects.exists())
+        for rate in ('', '1/s', '100/min', '5000/day'):
+            self.assertEqual(ApiKey.create_key('test', rate=rate).rate, rate)
+
+    def test_convert_app_id_created_after_rejected(self):
+        api_key = ApiKey(key=ApiKey.generate_key(), name='test')
+        response = client.get(self.url, HTTP_X_APP_ID=api_key.key)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        # unknown keys are not cached
+        api_key.save()
+        response = client.get(self.url, HTTP_X_APP_ID=api_key.key)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class FakeBucketBackend:
+    """ Shared token buckets in memory, same logic as Redis SYNC_SCRIPT """
+
+    def __init__(self):
+        self.buckets = {}
+
+    def sync(self, batch, now):
+        results = []
+        for key, capacity, fill_rate, consumed in batch:
+            tokens, timestamp = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0, now - timestamp) * fill_rate) - consumed
+            self.buckets[key] = (tokens, now)
+            results.append(tokens)
+        return results
+
+
+class TokenBucketTest(TestCase):
+    """ Test module for local token buckets """
+
+    def test_consume_and_refill(self):
+        bucket = TokenBucket(capacity=2, fill_rate=1, now=0)
+        self.assertTrue(bucket.consume(now=0))
+        self.assertTrue(bucket.consume(now=0))
+        self.assertFalse(bucket.consume(now=0.5))
+        self.assertEqual(bucket.wait(), 0.5)
+        self.assertTrue(bucket.consume(now=1))
+        self.assertEqual(bucket.consumed, 3)
+        # refill never exceeds capacity
+        bucket.refill(now=100)
+        self.assertEqual(bucket.tokens, 2)
+
+    def test_store_without_redis(self):
+        store = TokenBucketStore(redis_url='', sync_interval=3600)
+        self.assertEqual(store.consume('key', 1, 1 / 60)[0], True)
+        allowed, wait = store.consume('key', 1, 1 / 60)
+        self.assertFalse(allowed)
+        self.assertTrue(0 < wait <= 60)
+        self.assertTrue(store.consume('other key', 1, 1 / 60)[0])
+
+    def test_store_drops_idle_buckets(self):
+        store = TokenBucketStore(redis_url='')
+        store.consume('key', 10, 10)
+        now = store.buckets['key'].timestamp
+        self.assertEqual(store.collect(now), [('key', 10, 10, 1)])
+        self.assertEqual(store.collect(now + 1), [])
+        self.assertNotIn('key', store.buckets)
+
+    def test_stores_share_limit(self):
+        # 60/min limit, nodes get 50 requests per second each for 300 seconds
+        capacity, fill_rate, duration = 60, 1, 300
+        limit = capacity + fill_rate * duration
+        for nodes_num in (1, 2, 4):
+            backend = FakeBucketBackend()
+            stores = [TokenBucketStore(backend=backend, sync_interval=1, sync_batch=50) for _ in range(nodes_num)]
+            start = max(store.synced_at for store in stores)
+            allowed = 0
+            for step in range(duration * 50):
+                for node_num, store in enumerate(stores):
+                    now = start + step / 50 + node_num / 1000
+                    allowed += store.consume('key', capacity, fill_rate, now=now)[0]
+            self.assertLessEqual(allowed, limit + nodes_num)
+            self.assertGreaterEqual(allowed, limit - nodes_num)
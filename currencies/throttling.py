@@ -0,0 +1,274 @@
+import math
+import threading
+import time
+
+import redis
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import SimpleRateThrottle
+
+from simple_djangorest.settings import logger
+
+# refill shared bucket, take tokens consumed on node since its previous sync, return tokens left;
+# tokens go negative when nodes together took more than available, so overdraft is paid back by refill
+SYNC_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local fill_rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local consumed = tonumber(ARGV[4])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'timestamp')
+local tokens = tonumber(bucket[1]) or capacity
+local timestamp = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - timestamp) * fill_rate) - consumed
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'timestamp', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / fill_rate) + 1)
+return tostring(tokens)
+"""
+
+
+def throttled(wait):
+    """
+    Throttled exception with error in API format.
+
+    :param wait: seconds until next request allowed
+    :return: Throttled exception, its `wait` sets Retry-After header
+    """
+    wait = math.ceil(wait)
+    exc = Throttled(
+        detail={
+            'error': True,
+            'status': status.HTTP_429_TOO_MANY_REQUESTS,
+            'message': 'too_many_requests',
+            'description': f'Request rate limit exceeded - please try again in {wait} seconds'
+        },
+        code=status.HTTP_429_TOO_MANY_REQUESTS
+    )
+    exc.wait = wait
+    return exc
+
+
+class TokenBucket:
+    """
+    Bucket of `capacity` tokens refilled with `fill_rate` tokens per second.
+
+    Tokens are negative after sync when nodes together took more than available.
+    """
+
+    def __init__(self, capacity, fill_rate, now):
+        self.capacity = capacity
+        self.fill_rate = fill_rate
+        self.tokens = capacity
+        self.timestamp = now
+        # tokens consumed since last sync with Redis
+        self.consumed = 0
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + max(0, now - self.timestamp) * self.fill_rate)
+        self.timestamp = now
+
+    def consume(self, now):
+        """
+        Take one token from bucket.
+
+        :param now: current timestamp
+        :return: True if token taken else False
+        """
+        self.refill(now)
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.consumed += 1
+        return True
+
+    def wait(self):
+        """
+        :return: seconds until next token available
+        """
+        return max(0, 1 - self.tokens) / self.fill_rate
+
+    def is_idle(self):
+        """
+        Full bucket without unsynced tokens is same as new one, so it could be dropped.
+        """
+        return self.consumed == 0 and self.tokens >= self.capacity
+
+
+class RedisBucketBackend:
+    """
+    Shared token buckets in Redis.
+    """
+
+    def __init__(self, redis_url):
+        self.client = redis.Redis.from_url(redis_url, socket_timeout=0.1, socket_connect_timeout=0.1)
+        self.script = self.client.register_script(SYNC_SCRIPT)
+
+    def sync(self, batch, now):
+        """
+        Take consumed tokens from shared buckets with one pipeline.
+
+        :param batch: list of tuples (key, capacity, fill_rate, consumed)
+        :param now: batch collect timestamp
+        :return: list of shared tokens left
+        :raise redis.RedisError: on Redis errors
+        """
+        pipe = self.client.pipeline(transaction=False)
+        for key, capacity, fill_rate, consumed in batch:
+            self.script(keys=[f'throttle:{key}'], args=[capacity, fill_rate, now, consumed], client=pipe)
+        return [float(tokens) for tokens in pipe.execute()]
+
+
+class TokenBucketStore:
+    """
+    Token buckets kept in process memory and synced to shared backend (Redis) in batches.
+
+    Requests are checked against local buckets without network round-trip.
+    Every `sync_interval` seconds or after `sync_batch` local requests all buckets
+    report consumed tokens to backend and take shared tokens left. Shared bucket
+    keeps overdraft when nodes together took more than available, and local
+    buckets start from it, so over time all nodes together stay at the limit;
+    short bursts may exceed it by requests served between syncs.
+    Without backend (empty URL or connection error) buckets work as local only.
+    Params not passed are taken from THROTTLE_* settings.
+    """
+
+    def __init__(self, redis_url=None, sync_interval=None, sync_batch=None, backend=None):
+        if redis_url is None:
+            redis_url = settings.THROTTLE_REDIS_URL
+        if backend is None and redis_url:
+            backend = RedisBucketBackend(redis_url)
+        self.backend = backend
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.sync_interval = sync_interval if sync_interval is not None else settings.THROTTLE_SYNC_INTERVAL
+        self.sync_batch = sync_batch if sync_batch is not None else settings.THROTTLE_SYNC_BATCH
+        self.pending = 0
+        self.synced_at = time.time()
+
+    def consume(self, key, capacity, fill_rate, now=None):
+        """
+        Take one token from `key` bucket.
+
+        :param key: bucket key
+        :param capacity: bucket capacity
+        :param fill_rate: tokens per second
+        :param now: current timestamp, time.time() by default
+        :return: tuple (allowed, seconds to wait for next token)
+        """
+        if now is None:
+            now = time.time()
+        batch = None
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(capacity, fill_rate, now)
+            else:
+                bucket.capacity, bucket.fill_rate = capacity, fill_rate
+            allowed = bucket.consume(now)
+            wait = bucket.wait()
+            if allowed:
+                self.pending += 1
+            if now - self.synced_at >= self.sync_interval or \
+                    (self.backend is not None and self.pending >= self.sync_batch):
+                batch = self.collect(now)
+        if batch:
+            self.sync(batch, now)
+        return allowed, wait
+
+    def collect(self, now):
+        """
+        Drop idle buckets and take consumed tokens of others for sync (must be called under lock).
+
+        :param now: current timestamp
+        :return: list of tuples (key, capacity, fill_rate, consumed)
+        """
+        batch = []
+        for key, bucket in list(self.buckets.items()):
+            bucket.refill(now)
+            if bucket.is_idle():
+                del self.buckets[key]
+                continue
+            batch.append((key, bucket.capacity, bucket.fill_rate, bucket.consumed))
+            bucket.consumed = 0
+        self.pending = 0
+        self.synced_at = now
+        return batch
+
+    def sync(self, batch, now):
+        """
+        Report consumed tokens to backend and refresh local buckets with shared tokens left.
+
+        :param batch: list of tuples (key, capacity, fill_rate, consumed)
+        :param now: batch collect timestamp
+        """
+        if self.backend is None:
+            return
+        try:
+            results = self.backend.sync(batch, now)
+        except redis.RedisError as e:
+            logger.error(f'throttle sync error: {e}')
+            # keep consumed tokens to report them on next sync
+            with self.lock:
+                for key, capacity, fill_rate, consumed in batch:
+                    bucket = self.buckets.get(key)
+                    if bucket is not None:
+                        bucket.consumed += consumed
+            return
+
+        with self.lock:
+            for (key, capacity, fill_rate, consumed), tokens in zip(batch, results):
+                bucket = self.buckets.get(key)
+                if bucket is not None:
+                    # shared tokens were refilled up to `now`, tokens consumed locally
+                    # while syncing are not in backend yet
+                    bucket.tokens = tokens - bucket.consumed
+                    bucket.timestamp = now
+
+
+class ApiKeyRateThrottle(SimpleRateThrottle):
+    """
+    Limit request rate per API key.
+
+    Key `rate` overrides default `api_key` scope rate. Bucket capacity is
+    rate requests and it is refilled evenly during rate period.
+    """
+    scope = 'api_key'
+    store = TokenBucketStore()
+
+    def get_cache_key(self, request, view):
+        return request.auth.key
+
+    def allow_request(self, request, view):
+        rate = request.auth.rate or self.rate
+        if rate is None:
+            return True
+
+        num_requests, duration = self.parse_rate(rate)
+        allowed, wait = self.store.consume(self.get_cache_key(request, view), num_requests, num_requests / duration)
+        if not allowed:
+            raise throttled(wait)
+        return True
+
+
+class AppIdLookupThrottle(SimpleRateThrottle):
+    """
+    Limit DB lookups of APP IDs missing in cache per client IP.
+
+    Called by authentication before request is rejected, so clients trying
+    unknown APP IDs are throttled too. Valid keys are cached after first lookup.
+    """
+    scope = 'app_id_lookup'
+
+    def get_cache_key(self, request, view):
+        return f'app_id_lookup:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        allowed, wait = ApiKeyRateThrottle.store.consume(
+            self.get_cache_key(request, view), self.num_requests, self.num_requests / self.duration
+        )
+        if not allowed:
+            raise throttled(wait)
+        return True
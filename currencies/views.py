@@ -2,13 +2,15 @@ import datetime
 
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.decorators import api_view, renderer_classes
+from rest_framework.decorators import api_view, renderer_classes, authentication_classes, throttle_classes
 from rest_framework.exceptions import ValidationError
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from currencies.authentication import ApiKeyAuthentication
 from currencies.models import Currency, CurrencyRate
 from currencies.serializers import CurrencySerializer
+from currencies.throttling import ApiKeyRateThrottle
 from simple_djangorest.settings import logger
 
 
@@ -27,6 +29,8 @@ def currencies_list(request):
 
 @api_view(['GET'])
 @renderer_classes([JSONRenderer])
+@authentication_classes([ApiKeyAuthentication])
+@throttle_classes([ApiKeyRateThrottle])
 def currencies_convert(request, value, source, target):
     """
     Convert value from source to target currency.
@@ -5,7 +5,10 @@ import sys
 
 
 def main():
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'simple_djangorest.settings')
+    if sys.argv[1:2] == ['test']:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'simple_djangorest.settings_test')
+    else:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'simple_djangorest.settings')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
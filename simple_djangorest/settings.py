@@ -135,6 +135,23 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+REST_FRAMEWORK = {
+    'DEFAULT_THROTTLE_RATES': {
+        'api_key': '1000/hour',
+        # DB lookups of APP IDs missing in cache per client IP
+        'app_id_lookup': '60/min',
+    },
+}
+
+# API keys are cached in process memory to skip DB query on every request
+API_KEY_CACHE_TIMEOUT = 60
+
+# token buckets are kept in process memory and synced to Redis in batches:
+# every THROTTLE_SYNC_INTERVAL seconds or after THROTTLE_SYNC_BATCH local requests
+THROTTLE_REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/1'
+THROTTLE_SYNC_INTERVAL = 1
+THROTTLE_SYNC_BATCH = 50
+
 CELERY_BEAT_SCHEDULE = {
     'update_currencies': {
         'task': 'currencies.tasks.update_currencies',
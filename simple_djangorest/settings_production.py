@@ -0,0 +1,112 @@
+"""
+Production settings tuned for throughput of stateless JSON API.
+
+Select with environment:
+    export DJANGO_SETTINGS_MODULE=simple_djangorest.settings_production
+"""
+import logging
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from simple_djangorest.settings import *  # noqa: F401,F403
+from simple_djangorest.settings import LOGGING_CONF, REST_FRAMEWORK
+
+
+def _env_flag(name):
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('EXCHANGERATES_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('EXCHANGERATES_SECRET_KEY environment variable is required')
+
+ALLOWED_HOSTS = os.environ.get('EXCHANGERATES_ALLOWED_HOSTS', 'localhost').split(',')
+
+# API needs no sessions, users, messages or CSRF protection
+INSTALLED_APPS = [
+    'rest_framework',
+    'currencies',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+_context_processors = [
+    'django.template.context_processors.request',
+]
+
+# admin site and its dependencies are loaded only when enabled
+if _env_flag('EXCHANGERATES_ADMIN'):
+    INSTALLED_APPS = [
+        'django.contrib.admin',
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+    ] + INSTALLED_APPS
+    MIDDLEWARE += [
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ]
+    _context_processors += [
+        'django.contrib.auth.context_processors.auth',
+        'django.contrib.messages.context_processors.messages',
+    ]
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'OPTIONS': {
+            'context_processors': _context_processors,
+            # templates are compiled once per process
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    # do not import django.contrib.auth for anonymous requests
+    'UNAUTHENTICATED_USER': None,
+}
+
+DATABASES = {
+    'default': {
+        'ENGINE': os.environ.get('EXCHANGERATES_DB_ENGINE', 'django.db.backends.postgresql'),
+        'NAME': os.environ.get('EXCHANGERATES_DB_NAME', 'currency_exchange'),
+        'HOST': os.environ.get('EXCHANGERATES_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('EXCHANGERATES_DB_PORT', ''),
+        'USER': os.environ.get('EXCHANGERATES_DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('EXCHANGERATES_DB_PASS', ''),
+        # persistent connections: each worker thread reuses its connection instead of reconnecting per request
+        'CONN_MAX_AGE': int(os.environ.get('EXCHANGERATES_DB_CONN_MAX_AGE', 600)),
+        # required when DB is behind pgbouncer (EXCHANGERATES_DB_HOST/PORT) in transaction pooling mode
+        'DISABLE_SERVER_SIDE_CURSORS': _env_flag('EXCHANGERATES_DB_POOLER'),
+    },
+}
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['OPTIONS'] = {
+        'sslmode': os.environ.get('EXCHANGERATES_DB_SSLMODE', 'prefer'),
+    }
+
+USE_I18N = False
+
+# base settings configured logging with DEBUG level
+LOGGING_CONF = {**LOGGING_CONF, 'level': logging.ERROR}
+logging.getLogger().setLevel(LOGGING_CONF['level'])
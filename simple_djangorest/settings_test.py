@@ -0,0 +1,21 @@
+"""
+Test settings: sqlite DB built without migrations, throttling without Redis.
+
+Used by `manage.py test` by default, for other runners select with environment:
+    export DJANGO_SETTINGS_MODULE=simple_djangorest.settings_test
+"""
+from simple_djangorest.settings import *  # noqa: F401,F403
+from simple_djangorest.settings import INSTALLED_APPS
+
+# test runner keeps sqlite test DB in memory, so tests could run with --parallel
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+    },
+}
+
+# create tables directly from models
+MIGRATION_MODULES = {app.rsplit('.', 1)[-1]: None for app in INSTALLED_APPS}
+
+# token buckets work as local only
+THROTTLE_REDIS_URL = ''
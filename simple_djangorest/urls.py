@@ -1,5 +1,12 @@
-from django.urls import include, re_path
+from django.apps import apps
+from django.urls import include, path, re_path
 
 urlpatterns = [
     re_path(r'^api/', include('currencies.urls', namespace='api')),
 ]
+
+# admin is optional in production settings
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))